@@ -47,14 +47,116 @@ Notes:
 
 """
 
-import pathlib
+import functools
+import itertools
+import os
 import re
+import stat
 import sys
 
 from markdown.core import Markdown
 from markdown.extensions import Extension
 from markdown.preprocessors import Preprocessor
 
+_RAW_READ_MAX = 64 * 1024
+
+
+@functools.cache
+def _marker_re() -> re.Pattern[str]:
+    """Compile the `&[]()` marker pattern, on first use only.
+
+    Returns
+    -------
+    : re.Pattern[str]
+        Pattern capturing the leading spacing, line range(s) and path of a marker.
+
+    """
+    return re.compile(r"^(\s*?)&\[(.*?)\]\((.+?)\)\s*$")
+
+
+def _split_lines(text: str) -> tuple[str, ...]:
+    r"""Split text on line terminators, as `readlines()` would.
+
+    Parameters
+    ----------
+    text : str
+        Content of the file to insert.
+
+    Returns
+    -------
+    : tuple[str, ...]
+        Lines of the text, stripped from their line terminators.
+
+    Notes
+    -----
+    Contrary to `str.splitlines()`, only `\n`, `\r` and `\r\n` end a line: form feeds
+    and other exotic separators are left within the line so ranges stay aligned with
+    line numbers as displayed by any editor.
+
+    """
+    lines = text.replace("\r\n", "\n").replace("\r", "\n").split("\n")
+    if lines[-1] == "":
+        lines.pop()
+    return tuple(lines)
+
+
+@functools.lru_cache(maxsize=128)
+def _load(path: str, mtime_ns: int, size: int) -> tuple[str, ...]:
+    """Read (and cache) the lines of a small inserted file.
+
+    Parameters
+    ----------
+    path : str
+        Absolute path to the file to insert.
+    mtime_ns : int
+        Last modification time of the file; only used to invalidate the cache whenever
+        the file is modified between renders.
+    size : int
+        Size of the file in bytes, read in a single system call bypassing the buffered
+        text wrapper. Only meant for regular files, which report a reliable size.
+
+    Returns
+    -------
+    : tuple[str, ...]
+        Lines of the file, stripped from their line terminators.
+
+    """
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        data = os.read(fd, size)
+    finally:
+        os.close(fd)
+
+    # short read, let the buffered reader fetch the whole thing
+    if len(data) < size:
+        return _read(path)
+
+    return _split_lines(data.decode("utf-8"))
+
+
+def _read(path: str, stop: int | None = None) -> tuple[str, ...]:
+    """Read the lines of an inserted file through the buffered text reader.
+
+    Used for anything that is not a small regular file, or whenever a raw read comes
+    back short.
+
+    Parameters
+    ----------
+    path : str
+        Path to the file to insert.
+    stop : int | None
+        Number of lines to read at most; reading stops there. Defaults to `None`
+        (read the whole file).
+
+    Returns
+    -------
+    : tuple[str, ...]
+        Lines of the file, stripped from their line terminators.
+
+    """
+    with open(path, encoding="utf-8") as f:
+        return tuple(l.rstrip("\n") for l in itertools.islice(f, stop))
+
 
 class InsertPreprocessor(Preprocessor):
     """Preprocessor to catch and replace the `&[]()` markers.
@@ -102,14 +204,12 @@ class InsertPreprocessor(Preprocessor):
         """
         indices: list[int] = []
 
-        for r in ranges.strip().split():
-            try:
-                i, j = tuple(map(int, r.split("-")))  # check for nan
-                for n in range(i - 1, j):
-                    indices.append(n)
-            except ValueError:
-                n = int(r)  # check for nan
-                indices.append(n - 1)
+        for r in ranges.split():
+            parts = r.split("-", 1)
+            if len(parts) == 2 and parts[0]:
+                indices.extend(range(int(parts[0]) - 1, int(parts[1])))
+            else:
+                indices.append(int(r) - 1)
 
         return indices
 
@@ -125,36 +225,72 @@ class InsertPreprocessor(Preprocessor):
         -------
         : list[str]
             Same list of lines, but processed (*e.g.*, containing the inserted content).
-            The leading spacing -taken from the marker- is conserved for each inserted
-            line.
+            The leading spacing -taken from the marker- is prepended to each inserted
+            line, whose own indentation is kept. The input list itself is returned if
+            it does not contain any marker.
 
         Notes
         -----
         * *One per line!*
         * The current implementation allows inserting *within triple-quoted blocks*.
+        * Inserted lines are always emitted in file order, whatever the order of the
+          line ranges provided (overlapping ranges do not duplicate lines).
+        * Small files (up to 64 KiB) are cached between renders, keyed on their path,
+          size and modification time: an edit keeping the same size within the
+          timestamp granularity of the filesystem might not be picked up. Larger files
+          are read anew each time, and only up to the last line requested.
 
         """
-        extended_lines = []
+        # nothing to insert, hand back the lines untouched
+        if not any("&[" in line for line in lines):
+            return lines
+
+        extended_lines: list[str] = []
+        append = extended_lines.append
+        match = _marker_re().match
 
         for line in lines:
-            match = list(re.finditer(r"^(\s*?)&\[(.*?)\]\((.+?)\)$", line))
+            # cheap substring test first, the marker cannot match without it
+            if "&[" not in line:
+                append(line)
+                continue
+
+            m = match(line)
+
+            if m is not None:
+                spc, rng, src = m.groups()
+                indices = frozenset(self.expand_indices(rng))
 
-            if match:
-                spc, rng, src = match[0].groups()
-                indices = self.expand_indices(rng)
+                # marker paths always live under the configured prefix
+                path = os.path.join(self.parent_path, src.lstrip("/"))
 
                 try:
-                    with pathlib.Path(f"{self.parent_path}/{src}").open() as f:
-                        for i, l in enumerate(f.readlines()):
-                            if not indices or i in indices:
-                                extended_lines.append(f"{spc}{l.strip()}")
+                    st = os.stat(path)
+                    if stat.S_ISREG(st.st_mode) and 0 < st.st_size <= _RAW_READ_MAX:
+                        raw = _load(os.path.abspath(path), st.st_mtime_ns, st.st_size)
+                    elif indices:
+                        raw = _read(path, max(0, max(indices) + 1))
+                    else:
+                        raw = _read(path)
                 except FileNotFoundError:
-                    sys.stderr.write(
-                        f'ERROR: "{self.parent_path}/{src}" does not exist.\n',
-                    )
+                    sys.stderr.write(f'ERROR: "{path}" does not exist.\n')
+                    continue
+
+                if indices:
+                    n = len(raw)
+                    if len(indices) < n:
+                        raw = tuple(raw[i] for i in sorted(indices) if 0 <= i < n)
+                    else:
+                        # ranges wider than the file, cheaper to walk the file
+                        raw = tuple(l for i, l in enumerate(raw) if i in indices)
+
+                if spc:
+                    extended_lines.extend([spc + l for l in raw])
+                else:
+                    extended_lines.extend(raw)
 
             else:
-                extended_lines.append(line)
+                append(line)
 
         return extended_lines
 